@@ -1,4 +1,5 @@
 from .clear_console import ClearConsoleCommand  # noqa: F401
 from .console_loggings import *  # noqa: F401, F403
+from .open_git_repo_on_web import ClearGitRepoCacheCommand  # noqa: F401
 from .open_git_repo_on_web import OpenGitRepoOnWebCommand  # noqa: F401
 from .open_sublime_text_dir import OpenSublimeTextDirCommand  # noqa: F401
@@ -1,34 +1,39 @@
 from abc import ABCMeta
-from typing import Callable, Optional
+from typing import Any, Callable, Optional
 import sublime
 import sublime_plugin
 
-ST_METHODS = set(dir(sublime))
-
 
 class AbstractToggleConsoleLoggingCommand(sublime_plugin.ApplicationCommand, metaclass=ABCMeta):
-    @property
-    def logging_method_name(self) -> str:
-        # strips the leading "toggle_" from the command name
-        return self.name()[7:]
-
-    @property
-    def logging_method(self) -> Callable[..., None]:
-        return getattr(sublime, self.logging_method_name)
-
-    @property
-    def logging_status_method(self) -> Callable[[], bool]:
-        return getattr(sublime, f"get_{self.logging_method_name}")
+    # resolved once per subclass in `__init_subclass__`
+    logging_method_name: str = ""
+    logging_method: Callable[..., None]
+    logging_status_method: Callable[[], bool]
+    is_logging_supported: bool = False
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        # `name()` only needs the class so an uninitialized instance is enough
+        command_name = cls.__new__(cls).name()
+        # "toggle_log_fps" => "log_fps"
+        cls.logging_method_name = command_name[7:] if command_name.startswith("toggle_") else ""
+
+        method = getattr(sublime, cls.logging_method_name, None)
+        status_method = getattr(sublime, f"get_{cls.logging_method_name}", None)
+        cls.is_logging_supported = bool(method and status_method)
+        if cls.is_logging_supported:
+            cls.logging_method = staticmethod(method)  # type: ignore
+            cls.logging_status_method = staticmethod(status_method)  # type: ignore
 
     def description(self) -> str:
         # "toogle_log_fps" => "Toggle log fps"
         return self.name().replace("_", " ").capitalize()
 
     def is_checked(self) -> bool:
-        return (self.logging_status_method)()
+        return self.is_logging_supported and self.logging_status_method()
 
     def is_enabled(self) -> bool:
-        return self.logging_method_name in ST_METHODS
+        return self.is_logging_supported
 
     is_visible = is_enabled
 
@@ -1,15 +1,29 @@
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Callable, Optional, Tuple, Union
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Set, Tuple, Union
+import os
 import re
 import shlex
 import shutil
 import sublime
 import sublime_plugin
-import subprocess
 import threading
+import time
+
+if TYPE_CHECKING:
+    import subprocess
+
+PACKAGE_NAME = __package__.partition(".")[0]
 
 PathLike = Union[str, Path]
 
+_RE_FLAGS = re.IGNORECASE | re.MULTILINE
+RE_URI_SSH = re.compile(r"^ssh://", _RE_FLAGS)
+RE_URI_HTTP = re.compile(r"^https?://", _RE_FLAGS)
+RE_URI_GIT_AT = re.compile(r"^git@", _RE_FLAGS)
+RE_URL_DOT_GIT_SUFFIX = re.compile(r"\.git$", _RE_FLAGS)
+RE_GIT_VERSION = re.compile(r"(\d+)\.(\d+)\.(\d+)")
+
 
 class GitException(Exception):
     """Exception raised when something went wrong for git"""
@@ -21,121 +35,241 @@ class GitException(Exception):
 class Git:
     """Git command wrapper"""
 
+    # git_bin => its version, which never changes within a session
+    _version_cache: Dict[str, Optional[Tuple[int, int, int]]] = {}
+
     def __init__(
         self,
         repo_path: PathLike,
         git_bin: str = "git",
         encoding: str = "utf-8",
-        shell: bool = False,
         timeout_s: float = 3,
     ) -> None:
         """Init a Git wrapper with an instance"""
 
         # always use folder as repo path
-        if (path := Path(repo_path).resolve()).is_file():
-            path = path.parent
+        if os.path.isfile(path := os.path.realpath(repo_path)):
+            path = os.path.dirname(path)
 
         self.repo_path = path
-        self.git_bin = shutil.which(git_bin) or git_bin
+        # an absolute path is treated as already resolved, e.g., from `find_git_bin()`
+        self.git_bin = git_bin if os.path.isabs(git_bin) else (shutil.which(git_bin) or git_bin)
         self.encoding = encoding
-        self.shell = shell
         self.timeout_s = timeout_s
 
     def run(self, *args: str) -> str:
         """Run a git command."""
 
+        # lazily imported to speed up plugin loading
+        import subprocess
+
         cmd_tuple = (self.git_bin,) + args
 
-        if sublime.platform() == "windows":
-            # do not create a window for the process
-            startupinfo = subprocess.STARTUPINFO()  # type: ignore
-            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW  # type: ignore
-        else:
-            startupinfo = None  # type: ignore
-
-        process = subprocess.Popen(
-            cmd_tuple,
-            cwd=self.repo_path,
-            encoding=self.encoding,
-            shell=self.shell,
-            startupinfo=startupinfo,
-            stderr=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            text=True,
-        )
-
-        out, err = process.communicate(timeout=self.timeout_s)
+        try:
+            process = subprocess.Popen(
+                cmd_tuple,
+                cwd=self.repo_path,
+                # do not create a console window for the process on Windows
+                creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0),
+                # we only do read-only queries so never take optional locks such as `.git/index.lock`
+                # never wait for a credential prompt
+                env={**os.environ, "GIT_OPTIONAL_LOCKS": "0", "GIT_TERMINAL_PROMPT": "0"},
+                stderr=subprocess.PIPE,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+            )
+        except OSError as e:
+            # e.g., git is not installed or the cached git binary is gone
+            raise GitException(f"Failed to run `{self._quote_cmd(cmd_tuple)}`: {e}") from e
+
+        try:
+            out_b, err_b = process.communicate(timeout=self.timeout_s)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            # processes spawned by git (e.g., ssh or a credential helper) may still hold the pipes,
+            # so don't wait for their EOF but only reap git itself
+            try:
+                process.communicate(timeout=0.5)
+            except subprocess.TimeoutExpired:
+                process.wait()
+            finally:
+                self._close_pipes(process)
+            raise GitException(f"`{self._quote_cmd(cmd_tuple)}` timed out after {self.timeout_s} seconds")
+
+        out, err = out_b.decode(self.encoding, "replace"), err_b.decode(self.encoding, "replace")
         ret_code = process.poll() or 0
 
         if ret_code:
-            cmd_str = " ".join(map(shlex.quote, cmd_tuple))
-            raise GitException(f"`{cmd_str}` returned code {ret_code}: {err}")
+            raise GitException(f"`{self._quote_cmd(cmd_tuple)}` returned code {ret_code}: {err}")
 
         return out.rstrip()
 
+    @staticmethod
+    def _close_pipes(process: "subprocess.Popen[bytes]") -> None:
+        for name in ("stdout", "stderr"):
+            # on Windows, `communicate()` reads in threads and closing a pipe which is being read
+            # would wait for that read, i.e., the very hang we are avoiding
+            if (thread := getattr(process, f"{name}_thread", None)) and thread.is_alive():
+                continue
+            if pipe := getattr(process, name):
+                pipe.close()
+
+    @staticmethod
+    def _quote_cmd(cmd_tuple: Tuple[str, ...]) -> str:
+        return " ".join(map(shlex.quote, cmd_tuple))
+
     def get_version(self) -> Optional[Tuple[int, int, int]]:
+        if self.git_bin in self._version_cache:
+            return self._version_cache[self.git_bin]
+
         try:
-            m = re.search(r"(\d+)\.(\d+)\.(\d+)", self.run("version"))
-            return tuple(map(int, m.groups())) if m else None  # type: ignore
+            m = RE_GIT_VERSION.search(self.run("version"))
         except GitException:
             return None
 
-    def get_remote_web_url(self, remote: Optional[str] = None) -> Optional[str]:
-        try:
-            # use the tracking upstream
-            if not remote:
-                # `upstream` will be something like "refs/remotes/origin/master"
-                upstream = self.run("rev-parse", "--symbolic-full-name", "@{upstream}")
-                remote = re.sub(r"^refs/remotes/", "", upstream).partition("/")[0]
+        version: Optional[Tuple[int, int, int]] = None
+        if m:
+            major, minor, patch = map(int, m.groups())
+            version = (major, minor, patch)
 
-            remote_uri = self.run("remote", "get-url", remote)
-            remote_url = self.get_url_from_remote_uri(remote_uri)
+        self._version_cache[self.git_bin] = version
+        return version
 
-            return remote_url
-        except GitException:
-            return None
+    @classmethod
+    def clear_cache(cls) -> None:
+        """Clear caches shared by all instances."""
+        cls._version_cache.clear()
+
+    def get_remote_uri(self, remote: Optional[str] = None) -> str:
+        """
+        Get the URI of `remote`.
+
+        If `remote` is not given, `branch.<current>.remote` is used and falls back to `origin`
+        (or the only remote if there is just one), even for a detached HEAD or a branch without an upstream.
+        It fails if none of them can be found.
+        Note that an unknown `remote` name is echoed back as is rather than failing.
+        """
+
+        return self.run("ls-remote", "--get-url", *((remote,) if remote else ()))
 
     @staticmethod
     def is_in_git_repo(path: PathLike) -> bool:
-        path_prev, path = None, Path(path).resolve()
-        while path != path_prev:
+        return bool(Git.find_dot_git(os.path.abspath(os.fspath(path))))
+
+    @staticmethod
+    def find_dot_git(path: str) -> Optional[str]:
+        """Find the closest directory, from `path` upward, which contains a `.git`."""
+        path = os.path.realpath(path)
+        while True:
             # git dir or worktree, which has a .git file in it
-            if (path / ".git").exists():
-                return True
-            path_prev, path = path, path.parent
-        return False
+            if os.path.exists(os.path.join(path, ".git")):
+                return path
+            if (parent := os.path.dirname(path)) == path:
+                return None
+            path = parent
 
     @staticmethod
     def get_url_from_remote_uri(uri: str) -> Optional[str]:
         url: Optional[str] = None
-        re_flags = re.IGNORECASE | re.MULTILINE
 
         # SSH (unsupported)
-        if re.search(r"^ssh://", uri, re_flags):
+        if RE_URI_SSH.search(uri):
             url = None
 
         # HTTP
-        if re.search(r"^https?://", uri, re_flags):
+        if RE_URI_HTTP.search(uri):
             url = uri
 
         # common providers
-        if re.search(r"^git@", uri, re_flags):
+        if RE_URI_GIT_AT.search(uri):
             parts = uri[4:].split(":")  # "4:" removes "git@"
             host = ":".join(parts[:-1])
             path = parts[-1]
             url = f"https://{host}/{path}"
 
-        return re.sub(r"\.git$", "", url, re_flags) if url else None
+        return RE_URL_DOT_GIT_SUFFIX.sub("", url) if url else None
+
+
+@lru_cache
+def get_session_settings() -> sublime.Settings:
+    # this settings object is never saved hence acts as a session-scoped storage
+    return sublime.load_settings(f"{PACKAGE_NAME}.sublime-settings")
+
+
+@lru_cache
+def find_git_bin() -> Optional[str]:
+    """Find the git binary. The result is also kept for the whole ST session, i.e., survives plugin reloads."""
+    session = get_session_settings()
+    if (git_bin := session.get("_git_bin")) and os.path.isfile(git_bin):
+        return git_bin
+
+    if git_bin := shutil.which("git"):
+        session.set("_git_bin", git_bin)
+    return git_bin
+
+
+def get_remote_uri(git_dir: str, remote: Optional[str] = None) -> str:
+    """
+    `Git.get_remote_uri` which is memoized only if `remote` is given.
+    The default remote depends on the checked-out branch hence is always resolved freshly.
+    """
+    if remote:
+        return _get_remote_uri_cached(git_dir, remote)
+    return Git(git_dir, git_bin=find_git_bin() or "git").get_remote_uri()
+
+
+@lru_cache(maxsize=64)
+def _get_remote_uri_cached(git_dir: str, remote: str) -> str:
+    # failures are not cached since they raise
+    return Git(git_dir, git_bin=find_git_bin() or "git").get_remote_uri(remote)
+
+
+# git_dir => (whether it's in a git repo, when it's checked)
+# filled in the background by `is_in_git_repo_nonblocking`
+_in_git_repo_results: Dict[str, Tuple[bool, float]] = {}
+_in_git_repo_pending: Set[str] = set()
+_in_git_repo_lock = threading.Lock()
+# a negative result is re-checked after this, in case a repo is created or cloned there
+IN_GIT_REPO_NEGATIVE_TTL_S = 5.0
+
+
+def is_in_git_repo_nonblocking(git_dir: str) -> Optional[bool]:
+    """
+    Get the cached `Git.is_in_git_repo` result for `git_dir` without blocking.
+    If it's not known yet, `None` is returned and a check is scheduled on the async thread.
+    An expired negative result is still returned but a re-check is scheduled as well.
+    Concurrent calls for the same `git_dir` share a single scheduled check.
+    """
+
+    result: Optional[bool] = None
+    with _in_git_repo_lock:
+        if entry := _in_git_repo_results.get(git_dir):
+            result, checked_at = entry
+            if result or time.monotonic() - checked_at < IN_GIT_REPO_NEGATIVE_TTL_S:
+                return result
+        if git_dir in _in_git_repo_pending:
+            return result
+        _in_git_repo_pending.add(git_dir)
+
+    def warm() -> None:
+        is_in_repo = Git.is_in_git_repo(git_dir)
+        with _in_git_repo_lock:
+            _in_git_repo_results[git_dir] = (is_in_repo, time.monotonic())
+            _in_git_repo_pending.discard(git_dir)
+
+    sublime.set_timeout_async(warm)
+    return result
 
 
 def get_dir_for_git(view: sublime.View) -> Optional[str]:
+    # the result is used as a cache key so normalize it
     if filename := view.file_name():
-        return str(Path(filename).parent)
+        return os.path.dirname(os.path.abspath(filename))
 
     if not (window := view.window()):
         return None
 
-    return next(iter(window.folders()), None)
+    return os.path.abspath(folder) if (folder := next(iter(window.folders()), None)) else None
 
 
 def guarantee_git_dir(failed_return: Optional[Any] = None) -> Callable:
@@ -151,9 +285,17 @@ def guarantee_git_dir(failed_return: Optional[Any] = None) -> Callable:
 
 
 class OpenGitRepoOnWebCommand(sublime_plugin.WindowCommand):
+    """
+    Open the web page of the current git repo.
+
+    The URI of an explicitly given `remote` is cached, so run `clear_git_repo_cache`
+    after changing it with `git remote set-url`.
+    """
+
     @guarantee_git_dir(failed_return=False)
     def is_enabled(self, git_dir: str) -> bool:
-        return Git.is_in_git_repo(git_dir)
+        # optimistically enabled while unknown, `_worker` reports failures anyway
+        return is_in_git_repo_nonblocking(git_dir) is not False
 
     @guarantee_git_dir()
     def run(self, git_dir: str, remote: Optional[str] = None) -> None:
@@ -162,10 +304,23 @@ class OpenGitRepoOnWebCommand(sublime_plugin.WindowCommand):
 
     @staticmethod
     def _worker(git_dir: str, remote: Optional[str] = None) -> None:
-        if not (git := Git(git_dir)):
-            return
+        try:
+            # key on the repo root so that all sub-directories share a cache entry
+            remote_uri = get_remote_uri(Git.find_dot_git(git_dir) or git_dir, remote)
+        except GitException:
+            remote_uri = ""
 
-        if not (repo_url := git.get_remote_web_url(remote=remote)):
+        if not (repo_url := Git.get_url_from_remote_uri(remote_uri)):
             return sublime.error_message("Can't determine repo web URL...")
 
         sublime.run_command("open_url", {"url": repo_url})
+
+
+class ClearGitRepoCacheCommand(sublime_plugin.ApplicationCommand):
+    def run(self) -> None:
+        _get_remote_uri_cached.cache_clear()
+        Git.clear_cache()
+        with _in_git_repo_lock:
+            _in_git_repo_results.clear()
+        find_git_bin.cache_clear()
+        get_session_settings().erase("_git_bin")
@@ -1,56 +1,59 @@
 from functools import lru_cache
-from pathlib import Path
 from typing import Dict
+import os
 import sublime
 import sublime_plugin
-import tempfile
 
 PACKAGE_NAME = __package__.partition(".")[0]
 
 
 @lru_cache
 def get_folder_map() -> Dict[str, str]:
-    cache_path = Path(sublime.cache_path())
-    packages_path = Path(sublime.packages_path())
+    # lazily imported to speed up plugin loading
+    import tempfile
+
+    # paths from ST are already absolute so they are only normalized, which needs no syscall
+    cache_path = sublime.cache_path()
+    data_path = os.path.join(sublime.packages_path(), "..")
 
     return {
-        name: str(path.resolve())
-        for name, path in {
-            # from OS
-            "home": Path.home(),
-            "temp_dir": Path(tempfile.gettempdir()),
-            # from ST itself
-            "bin": Path(sublime.executable_path()).parent,
-            "cache": cache_path,
-            "data": packages_path / "..",
-            "index": cache_path / ".." / "Index",
-            "installed_packages": Path(sublime.installed_packages_path()),
-            "lib": packages_path / ".." / "Lib",
-            "local": packages_path / ".." / "Local",
-            "log": packages_path / ".." / "Log",
-            "packages": packages_path,
-            # from LSP
-            "package_storage": cache_path / ".." / "Package Storage",
-        }.items()
+        # from OS
+        "home": os.path.realpath(os.path.expanduser("~")),
+        "temp_dir": os.path.realpath(tempfile.gettempdir()),
+        **{
+            name: os.path.normpath(path)
+            for name, path in {
+                # from ST itself
+                "bin": os.path.dirname(sublime.executable_path()),
+                "cache": cache_path,
+                "data": data_path,
+                "index": os.path.join(cache_path, "..", "Index"),
+                "installed_packages": sublime.installed_packages_path(),
+                "lib": os.path.join(data_path, "Lib"),
+                "local": os.path.join(data_path, "Local"),
+                "log": os.path.join(data_path, "Log"),
+                "packages": sublime.packages_path(),
+                # from LSP
+                "package_storage": os.path.join(cache_path, "..", "Package Storage"),
+            }.items()
+        },
     }
 
 
 class OpenSublimeTextDirCommand(sublime_plugin.ApplicationCommand):
     def run(self, folder: str, error_on_not_found: bool = True) -> None:
         window = sublime.active_window()
-        path = Path(
-            sublime.expand_variables(
-                folder,
-                {
-                    **window.extract_variables(),
-                    **get_folder_map(),
-                },
-            )
+        path = sublime.expand_variables(
+            folder,
+            {
+                **window.extract_variables(),
+                **get_folder_map(),
+            },
         )
 
-        if not path.is_dir():
+        if not os.path.isdir(path):
             if error_on_not_found:
                 sublime.error_message(f"[{PACKAGE_NAME}] Directory not found: `{path}`")
             return
 
-        window.run_command("open_dir", {"dir": str(path)})
+        window.run_command("open_dir", {"dir": path})